@@ -0,0 +1,102 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+# -*- coding:utf-8 -*-
+
+"""
+C implementation of WeightQuickUnionDisjointSet, used by MazeCellDSet when it is compiled.
+"""
+import numpy
+
+# parent和sz是numpy.int32数组，用int[::1]直接访问它们的前提是C的int是32位的
+# 不满足时让import失败，MazeCellDSet会退回到python实现
+if sizeof(int) != 4:
+    raise ImportError("CDSet needs a 32-bit C int to share numpy.int32 buffers")
+
+
+cdef class CDSet:
+    """
+    union时间复杂度为logN，find时间复杂度为logN
+    加了路径压缩以后，union和find时间复杂度接近1（有均摊成本）
+    和WeightQuickUnionDisjointSet一样把parent和sz暴露为int32的numpy数组，可以直接传给_kruskal_core
+    """
+    cdef readonly object parent
+    cdef readonly object sz
+    cdef int[::1] _parent
+    cdef int[::1] _sz
+    cdef int _n
+    cdef public int _count
+
+    def __init__(self, int n):
+        self._n = n
+        self._count = n
+        # parent和sz分开存放，find只访问parent
+        self.parent = numpy.arange(n, dtype=numpy.int32)
+        self.sz = numpy.ones(n, dtype=numpy.int32)
+        self._parent = self.parent
+        self._sz = self.sz
+
+    cdef inline int _check(self, int p) except -1:
+        # 关掉了boundscheck，越界的下标必须在进入_find/_union之前拦下来
+        if not 0 <= p < self._n:
+            raise IndexError("node %s out of range [0, %s)" % (p, self._n))
+        return 0
+
+    cdef inline int _find(self, int p) noexcept nogil:
+        # 路径减半: 一边向上查找一边把节点连接到祖父节点，只需要一次遍历
+        while p != self._parent[p]:
+            self._parent[p] = self._parent[self._parent[p]]
+            p = self._parent[p]
+        return p
+
+    cdef inline bint _union(self, int p, int q) noexcept nogil:
+        cdef int p_root = self._find(p)
+        cdef int q_root = self._find(q)
+        if q_root == p_root:
+            return False
+        # 总是把小树的根节点连接到大树的根节点
+        if self._sz[p_root] < self._sz[q_root]:
+            self._parent[p_root] = q_root
+            self._sz[q_root] += self._sz[p_root]
+        else:
+            self._parent[q_root] = p_root
+            self._sz[p_root] += self._sz[q_root]
+        self._count -= 1
+        return True
+
+    # union是cython的关键字，不能声明成cpdef，只能用def包一层
+    def union(self, int p, int q):
+        self._check(p)
+        self._check(q)
+        self._union(p, q)
+
+    cpdef int find(self, int p) except? -1:
+        self._check(p)
+        return self._find(p)
+
+    cpdef bint is_connected(self, int p, int q) except? -1:
+        self._check(p)
+        self._check(q)
+        return self._find(p) == self._find(q)
+
+    cpdef int count(self):
+        return self._count
+
+    def kruskal(self, int[:, ::1] walls, unsigned char[::1] grid_flat):
+        """
+        和_kruskal_core一样依次尝试打通walls中的墙，没有numba时KruskalMaze用它跑整个循环
+        walls由_wall_table生成，里面的下标不再检查
+        返回剩余的连通分量的数量
+        """
+        cdef Py_ssize_t i
+        with nogil:
+            for i in range(walls.shape[0]):
+                if self._union(walls[i, 0], walls[i, 1]):
+                    grid_flat[walls[i, 2]] = 0
+                    if self._count == 1:
+                        break
+        return self._count
+
+    def __repr__(self):
+        return str({
+            "parent": self.parent,
+            "count": self._count,
+        })
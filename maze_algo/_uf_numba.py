@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+"""
+Union-find kernels operating directly on the int32 parent/size arrays of WeightQuickUnionDisjointSet.
+
+They are compiled with numba when it is installed; otherwise the very same functions run as plain python.
+
+Two ways of compressing the path while finding are provided, path halving and path splitting. They have the same
+amortized bound but different constant factors depending on the CPU, so when numba is installed both are benchmarked
+once at import time and _find, _union_by_size and _kruskal_core are bound to the variants of the faster one.
+"""
+import time
+
+import numpy
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional
+    _HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+else:
+    _HAVE_NUMBA = True
+
+
+@njit("int32(int32[::1], int32)", cache=True)
+def _find_halving(parent, p):
+    """
+    返回p所在的分量的根节点，查找的同时做路径减半: 每个经过的节点都连接到祖父节点，然后跳到祖父节点
+    """
+    while p != parent[p]:
+        parent[p] = parent[parent[p]]
+        p = parent[p]
+    return p
+
+
+@njit("int32(int32[::1], int32)", cache=True)
+def _find_splitting(parent, p):
+    """
+    返回p所在的分量的根节点，查找的同时做路径分裂: 每个经过的节点都连接到祖父节点，然后跳到原来的父节点
+    """
+    while p != parent[p]:
+        next_p = parent[p]
+        parent[p] = parent[next_p]
+        p = next_p
+    return p
+
+
+_UNION_SIGNATURE = "boolean(int32[::1], int32[::1], int32, int32)"
+_KRUSKAL_SIGNATURE = "int64(int32[:, ::1], int32[::1], int32[::1], uint8[::1], int64)"
+
+
+@njit(_UNION_SIGNATURE, cache=True)
+def _union_by_size_halving(parent, sz, p, q):
+    """
+    把p和q所在的分量合并，小树的根节点连接到大树的根节点
+    返回是否真的发生了合并
+    """
+    p_root = _find_halving(parent, p)
+    q_root = _find_halving(parent, q)
+    if p_root == q_root:
+        return False
+    if sz[p_root] < sz[q_root]:
+        parent[p_root] = q_root
+        sz[q_root] += sz[p_root]
+    else:
+        parent[q_root] = p_root
+        sz[p_root] += sz[q_root]
+    return True
+
+
+@njit(_UNION_SIGNATURE, cache=True)
+def _union_by_size_splitting(parent, sz, p, q):
+    """
+    和_union_by_size_halving一样，只是查找用路径分裂
+    """
+    p_root = _find_splitting(parent, p)
+    q_root = _find_splitting(parent, q)
+    if p_root == q_root:
+        return False
+    if sz[p_root] < sz[q_root]:
+        parent[p_root] = q_root
+        sz[q_root] += sz[p_root]
+    else:
+        parent[q_root] = p_root
+        sz[p_root] += sz[q_root]
+    return True
+
+
+@njit(_KRUSKAL_SIGNATURE, cache=True)
+def _kruskal_core_halving(walls, parent, sz, grid_flat, n_components):
+    """
+    依次尝试打通walls中的墙，墙两边的单元格不连通时合并它们，并把墙置为0
+    walls每一行是(cell_a, cell_b, grid_flat)，即墙两边单元格的编号和墙在展平后的grid中的下标
+    n_components是开始时的连通分量的数量，返回剩余的连通分量的数量
+    parent和sz是两个独立的连续数组，查找只访问parent
+    所有下标都已经在_wall_table中算好，循环里只有查找和合并，没有任何乘除和取模
+    """
+    for i in range(walls.shape[0]):
+        if _union_by_size_halving(parent, sz, walls[i, 0], walls[i, 1]):
+            grid_flat[walls[i, 2]] = 0
+            n_components -= 1
+            if n_components == 1:
+                break
+    return n_components
+
+
+@njit(_KRUSKAL_SIGNATURE, cache=True)
+def _kruskal_core_splitting(walls, parent, sz, grid_flat, n_components):
+    """
+    和_kruskal_core_halving一样，只是查找用路径分裂
+    """
+    for i in range(walls.shape[0]):
+        if _union_by_size_splitting(parent, sz, walls[i, 0], walls[i, 1]):
+            grid_flat[walls[i, 2]] = 0
+            n_components -= 1
+            if n_components == 1:
+                break
+    return n_components
+
+
+def _benchmark(kruskal_core, n=1 << 16, repeat=3):
+    """
+    在随机生成的n个节点的并查集上跑kruskal_core，返回最快一次的耗时
+    """
+    rng = numpy.random.default_rng(0)
+    walls = rng.integers(0, n, size=(2 * n, 3), dtype=numpy.int32)
+    walls[:, 2] = 0
+    grid_flat = numpy.ones(1, dtype=numpy.uint8)
+    best = float("inf")
+    for _ in range(repeat):
+        parent = numpy.arange(n, dtype=numpy.int32)
+        sz = numpy.ones(n, dtype=numpy.int32)
+        start = time.perf_counter()
+        kruskal_core(walls, parent, sz, grid_flat, n)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _pick_find():
+    """
+    穷人版的PGO: 没有numba时直接用路径减半，有numba时选在当前CPU上更快的那个
+    所有kernel都缓存在磁盘上，import时只需要跑一次几毫秒的benchmark
+    """
+    halving = (_find_halving, _union_by_size_halving, _kruskal_core_halving)
+    if not _HAVE_NUMBA:
+        return halving
+    splitting = (_find_splitting, _union_by_size_splitting, _kruskal_core_splitting)
+    return min((halving, splitting), key=lambda candidate: _benchmark(candidate[2]))
+
+
+_find, _union_by_size, _kruskal_core = _pick_find()
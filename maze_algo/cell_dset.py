@@ -1,30 +1,47 @@
-from typing import List, Tuple
-from maze_algo.disjoint_set import WeightQuickUnionDisjointSet as DSet
+from maze_algo._uf_numba import _HAVE_NUMBA, _kruskal_core
+
+try:
+    from maze_algo._disjoint_set import CDSet as DSet
+except ImportError:  # the C extension is not built
+    from maze_algo.disjoint_set import WeightQuickUnionDisjointSet as DSet
+
+    _HAVE_CDSET = False
+else:
+    _HAVE_CDSET = True
 
 
 class MazeCellDSet(object):
-    def __init__(self, point_ls: List[Tuple[int, int]], width: int, height: int):
+    def __init__(self, width: int, height: int):
         self.width = width
         self.height = height
-        self.index_map = {}
-        self.dset = DSet(len(point_ls))
-        for i, (x, y) in enumerate(point_ls):
-            index = x + y * self.width
-            self.index_map[index] = i
+        # cells are the points whose x and y are both even,
+        # so (x >> 1) + (y >> 1) * cw maps them onto 0..N-1 directly
+        self.cw = (width + 1) // 2
+        self.dset = DSet(self.cw * ((height + 1) // 2))
 
     def _find(self, x, y):
-        index = x + y * self.width
-        # !! if self.index_map[index] is not int, you finding the illegal point
-        return self.dset.find(self.index_map[index])
+        # !! x and y must both be even, otherwise you are finding the illegal point
+        return self.dset.find((x >> 1) + (y >> 1) * self.cw)
 
     def is_connected(self, x1, y1, x2, y2):
         return self._find(x1, y1) == self._find(x2, y2)
 
     def union(self, x1, y1, x2, y2):
-        index1 = x1 + y1 * self.width
-        index2 = x2 + y2 * self.width
+        index1 = (x1 >> 1) + (y1 >> 1) * self.cw
+        index2 = (x2 >> 1) + (y2 >> 1) * self.cw
         # print(f"union ({x1},{y1}) ({x2},{y2}) index1:{index1} index2:{index2}")
-        self.dset.union(self.index_map[index1], self.index_map[index2])
+        self.dset.union(index1, index2)
 
     def count(self):
         return self.dset.count()
+
+    def remove_walls(self, walls, grid_flat):
+        """
+        run the Kruskal wall loop of _kruskal_core over walls built by _wall_table,
+        in numba if it is installed, otherwise in the C extension if it is built, otherwise in plain python
+        """
+        dset = self.dset
+        if _HAVE_NUMBA or not _HAVE_CDSET:
+            dset._count = _kruskal_core(walls, dset.parent, dset.sz, grid_flat, dset.count())
+        else:
+            dset.kruskal(walls, grid_flat)
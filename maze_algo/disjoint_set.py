@@ -12,32 +12,32 @@ tree of a graph.
 Note that the implementation as disjoint-set forests doesn't allow the deletion of edges, even without path compression
 or the rank heuristic.
 """
-from abc import ABC, abstractmethod
+import numpy
 
+from maze_algo._uf_numba import _find, _union_by_size
+
+
+class AbstractDisjointSet(object):
+    __slots__ = ()
 
-class AbstractDisjointSet(ABC):
-    @abstractmethod
     def union(self, p: int, q: int) -> None:
         """
         在p和q之间添加一条连接
         """
         pass
 
-    @abstractmethod
     def find(self, p: int) -> int:
         """
         返回p所在的分量的标识符
         """
         pass
 
-    @abstractmethod
     def is_connected(self, p: int, q: int) -> bool:
         """
         判断p和q两点是否连通
         """
         pass
 
-    @abstractmethod
     def count(self) -> int:
         """
         返回连通分量的数量
@@ -50,6 +50,7 @@ class QuickUnionDisjointSet(AbstractDisjointSet):
     union时间复杂度为树的高度，find时间复杂度为树的高度,然而都不是lgN
     任何时候都不该使用这个实现，用WeightQuickUnionDisjointSet代替
     """
+    __slots__ = ('_count', 'parent_map')
 
     def __init__(self, n: int):
         self._count = n
@@ -88,25 +89,25 @@ class QuickFindDisjointSet(AbstractDisjointSet):
     union时间复杂度为N，find时间复杂度为1
     查找高效,但 union低效的实现，不适用于需要动态给两个节点建立连接的情况
     """
+    __slots__ = ('_count', 'parent', '_buf')
 
     def __init__(self, n: int):
         self._count = n
-        self.parent_map = {}
-        for i in range(1, n):
-            self.parent_map[i] = i
+        self.parent = numpy.arange(n, dtype=numpy.int32)
+        # union时用来标记属于p所在分量的节点，避免每次union都重新分配
+        self._buf = numpy.empty(n, dtype=numpy.bool_)
 
     def union(self, p: int, q: int) -> None:
         p_id = self.find(p)
         q_id = self.find(q)
         if q_id == p_id:
             return
-        for i in self.parent_map.items():
-            if self.parent_map[i] == p_id:
-                self.parent_map[i] = q_id
+        numpy.equal(self.parent, p_id, out=self._buf)
+        self.parent[self._buf] = q_id
         self._count = self._count - 1
 
     def find(self, p: int) -> int:
-        return self.parent_map[p]
+        return self.parent[p]
 
     def is_connected(self, p: int, q: int) -> bool:
         return self.find(p) == self.find(q)
@@ -116,48 +117,42 @@ class QuickFindDisjointSet(AbstractDisjointSet):
 
 
 class WeightQuickUnionDisjointSet(AbstractDisjointSet):
+    __slots__ = ('_count', 'parent', 'sz')
+
     def __init__(self, n: int):
         """`
         union时间复杂度为logN，find时间复杂度为logN
         加了路径压缩以后，union和find时间复杂度接近1（有均摊成本）
         """
         self._count = n
-        self.parent_map = {}
-        self.sz_map = {}
-        for i in range(n):
-            self.parent_map[i] = i
-            self.sz_map[i] = 1
+        # 节点编号是连续的0..n-1，直接用数组下标代替dict查找
+        # parent和sz是两个独立的连续数组而不是一个二维数组的两列:
+        # find只读写parent，sz只在union时读两个根节点，分开存放可以让find不把sz带进缓存
+        self.parent = numpy.arange(n, dtype=numpy.int32)
+        self.sz = numpy.ones(n, dtype=numpy.int32)
+
+    def _check(self, p: int) -> None:
+        # numba编译的kernel不做越界检查，越界的下标必须在调用之前拦下来
+        if not 0 <= p < self.parent.shape[0]:
+            raise IndexError("node %s out of range [0, %s)" % (p, self.parent.shape[0]))
 
     def union(self, p: int, q: int) -> None:
-        p_root = self.find(p)
-        q_root = self.find(q)
-        if q_root == p_root:
-            return
+        self._check(p)
+        self._check(q)
         # 总是把小树的根节点连接到大树的根节点
-        if self.sz_map[p_root] < self.sz_map[q_root]:
-            self.parent_map[p_root] = q_root
-            self.sz_map[q_root] = self.sz_map[p_root] + self.sz_map[q_root]
-        else:
-            self.parent_map[q_root] = p_root
-            self.sz_map[p_root] = self.sz_map[p_root] + self.sz_map[q_root]
-        self._count = self._count - 1
+        if _union_by_size(self.parent, self.sz, p, q):
+            self._count = self._count - 1
 
     def find(self, p: int) -> int:
-        q = p
-        while q != self.parent_map[q]:
-            q = self.parent_map[q]
-        # # 路径压缩,压缩以后高度为2了
-        while p != self.parent_map[p]:
-            p_last = p
-            p = self.parent_map[p]
-            self.parent_map[p_last] = q
-            self.sz_map[p_last] = 2
-        return q
+        self._check(p)
+        # 路径减半或路径分裂(见_uf_numba): 一边向上查找一边把节点连接到祖父节点，只需要一次遍历
+        # 查找是迭代而不是递归的，树再高也不会栈溢出
+        return _find(self.parent, p)
 
     def __repr__(self):
         return str({
-            "parent_map": self.parent_map,
-            # "sz_map": self.sz_map,
+            "parent": self.parent,
+            # "sz": self.sz,
             "count": self._count,
         })
 
@@ -182,6 +177,20 @@ def test_tiny_quick_union():
         print(uf)
 
 
+def test_tiny_quick_find():
+    with open("tinyUF.txt") as f:
+        array_len = int(next(f))
+        uf = QuickFindDisjointSet(array_len)
+        for line in f:
+            p, q = [int(x) for x in line.split()]
+            if uf.is_connected(p, q):
+                continue
+            uf.union(p, q)
+            print("%s %s" % (p, q))
+        print("%s components" % uf.count())
+        assert uf.count() == 2
+
+
 def test_tiny_weight_quick_union():
     with open("tinyUF.txt") as f:
         array_len = int(next(f))
@@ -225,16 +234,55 @@ def test_test_medium_weight_quick_union():
         for i in range(array_len):
             uf.find(i)
         value_map = {}
-        for value in uf.parent_map.values():
-            value_map[value] = True
+        for value in uf.parent:
+            value_map[int(value)] = True
         print("%s components" % uf.count())
         print("value_map:%s" % value_map)
 
 
+def test_deep_weight_quick_union():
+    # 手工构造一条远超递归深度限制的链，find必须是迭代的
+    array_len = 100000
+    uf = WeightQuickUnionDisjointSet(array_len)
+    uf.parent[1:] = numpy.arange(array_len - 1, dtype=numpy.int32)
+    assert uf.find(array_len - 1) == 0
+    assert uf.find(array_len - 1) == 0
+    print("parent of the deepest node after find: %s" % uf.parent[array_len - 1])
+
+
+def test_tiny_c_disjoint_set():
+    try:
+        from maze_algo._disjoint_set import CDSet
+    except ImportError:
+        print("the C extension is not built, run python3 setup.py build_ext --inplace first")
+        return
+    with open("tinyUF.txt") as f:
+        array_len = int(next(f))
+        uf = CDSet(array_len)
+        for line in f:
+            p, q = [int(x) for x in line.split()]
+            if uf.is_connected(p, q):
+                continue
+            uf.union(p, q)
+            print("%s %s" % (p, q))
+        print("%s components" % uf.count())
+        assert uf.count() == 2
+    # C实现关掉了boundscheck，越界必须抛IndexError而不是写坏内存
+    for p in (-1, array_len, 10 ** 6):
+        try:
+            uf.find(p)
+        except IndexError:
+            pass
+        else:
+            raise AssertionError("find(%s) should raise IndexError" % p)
+
+
 if __name__ == '__main__':
-    # test_tiny()
+    # test_tiny_quick_find()
     # test_tiny_quick_union()
     # test_tiny_weight_quick_union()
     # test_medium_quick_union()
+    # test_deep_weight_quick_union()
+    # test_tiny_c_disjoint_set()
     test_test_medium_weight_quick_union()
     pass
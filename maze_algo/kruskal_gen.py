@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 # -*- coding:utf-8 -*-
 
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
 import numpy
-from numpy import random
 from maze_algo.cell_dset import MazeCellDSet
 
 """
@@ -22,13 +24,44 @@ The w(little W) is only a dot in such 3X3 maze.
 """
 
 
+def _points(xs, ys):
+    """
+    return all the (x, y) points of xs × ys as an int32 array of shape (len(xs) * len(ys), 2)
+    """
+    return numpy.stack(numpy.meshgrid(xs, ys, indexing="ij"), -1).reshape(-1, 2).astype(numpy.int32)
+
+
+def _wall_table(width, height, cw):
+    """
+    return all the walls as an int32 array of shape (N, 3),
+    each row is (cell_a, cell_b, grid_flat): the ids of the two cells the wall separates in MazeCellDSet,
+    and the index of the wall in the flattened grid.
+    All the index arithmetic is done here once, vectorized, so _kruskal_core never has to compute an index.
+    """
+    h_walls = _points(numpy.arange(1, width, 2), numpy.arange(0, height, 2))
+    v_walls = _points(numpy.arange(0, width, 2), numpy.arange(1, height, 2))
+    # a horizontal wall separates the cells on its left and right
+    h_a = ((h_walls[:, 0] - 1) >> 1) + (h_walls[:, 1] >> 1) * cw
+    h_b = h_a + 1
+    # a vertical wall separates the cells above and below it
+    v_a = (v_walls[:, 0] >> 1) + ((v_walls[:, 1] - 1) >> 1) * cw
+    v_b = v_a + cw
+    xy = numpy.concatenate((h_walls, v_walls))
+    return numpy.column_stack((
+        numpy.concatenate((h_a, v_a)),
+        numpy.concatenate((h_b, v_b)),
+        xy[:, 0] * height + xy[:, 1],
+    )).astype(numpy.int32)
+
+
 class KruskalMaze(object):
-    def __init__(self, width: int, height: int, not_care_random=True):
+    def __init__(self, width: int, height: int, not_care_random=True, seed: Optional[int] = None):
         """
         Init a maze.
 
         :param width: the width of the maze
         :param height: the height of the maze
+        :param seed: the seed of the random generator, the same seed always generates the same maze
         """
         if height % 2 == 0 or height < 3:
             raise Exception("illegal height because each wall's height is one.")
@@ -36,43 +69,87 @@ class KruskalMaze(object):
             raise Exception("illegal width because each wall's width is one.")
         self.height = height
         self.width = width
-        count = self.height * self.width
-        self.index_ls = list(range(1, count))
-        self.grid = numpy.ones((width, height))
-        cell_ls = [(x, y) for x in range(0, width, 2) for y in range(0, height, 2)]
-        not_care_ls = [(x, y) for x in range(1, width, 2) for y in range(1, height, 2)]
-        wall_ls = [(x, y) for x in range(1, width, 2) for y in range(0, height, 2)] + [
-            (x, y) for x in range(0, width, 2) for y in range(1, height, 2)
-        ]
-        for x, y in cell_ls:
-            self.grid[x][y] = 0
-        cell_dset = MazeCellDSet(cell_ls, width, height)
-        random.shuffle(wall_ls)
-        for x, y in wall_ls:
-            if cell_dset.count() == 1:
-                break
-            if x % 2 == 1:
-                x1 = x - 1
-                x2 = x + 1
-                if not cell_dset.is_connected(x1, y, x2, y):
-                    cell_dset.union(x1, y, x2, y)
-                    self.grid[x][y] = 0
-            else:
-                y1 = y - 1
-                y2 = y + 1
-                if not cell_dset.is_connected(x, y1, x, y2):
-                    self.grid[x][y] = 0
-                    cell_dset.union(x, y1, x, y2)
+        self.grid = numpy.ones((width, height), dtype=numpy.uint8)
+        grid_flat = self.grid.reshape(-1)
+        # cells are the points whose x and y are both even
+        self.grid[0::2, 0::2] = 0
+        rng = numpy.random.default_rng(seed)
+        cell_dset = MazeCellDSet(width, height)
+        walls = _wall_table(width, height, cell_dset.cw)
+        cell_dset.remove_walls(rng.permutation(walls), grid_flat)
         if not_care_random:
-            additional_wall = random.randint(0, len(not_care_ls))
-            for i in random.choice(len(not_care_ls), additional_wall, False):
-                x, y = not_care_ls[i]
-                self.grid[x][y] = 0
+            # flat grid indices of the points whose x and y are both odd
+            not_care = numpy.add.outer(numpy.arange(1, width, 2) * height, numpy.arange(1, height, 2)).reshape(-1)
+            additional_wall = rng.integers(0, len(not_care))
+            grid_flat[not_care[rng.choice(len(not_care), additional_wall, replace=False)]] = 0
+
+    @classmethod
+    def generate_batch(cls, count: int, width: int, height: int, *, not_care_random=True,
+                       workers: Optional[int] = None, seed: int = 0) -> List["KruskalMaze"]:
+        """
+        Generate mazes in parallel processes.
+
+        :param count: the number of mazes
+        :param width: the width of each maze
+        :param height: the height of each maze
+        :param workers: the number of processes, default to the number of CPUs
+        :param seed: the i-th maze is generated with seed + i, so the batch is reproducible
+        """
+        args = [(cls, width, height, not_care_random, seed + i) for i in range(count)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_build_maze, args))
 
     def __str__(self):
         return str(self.grid)
 
 
+def _build_maze(args):
+    cls, width, height, not_care_random, seed = args
+    return cls(width, height, not_care_random, seed)
+
+
+def test_c_kruskal():
+    try:
+        from maze_algo._disjoint_set import CDSet
+    except ImportError:
+        print("the C extension is not built, run python3 setup.py build_ext --inplace first")
+        return
+    from maze_algo._uf_numba import _kruskal_core
+    width, height = 41, 31
+    cell_dset = MazeCellDSet(width, height)
+    walls = numpy.random.default_rng(0).permutation(_wall_table(width, height, cell_dset.cw))
+    n = cell_dset.cw * ((height + 1) // 2)
+    # the C loop and _kruskal_core must open exactly the same walls in the same order
+    c_grid = numpy.ones(width * height, dtype=numpy.uint8)
+    c_dset = CDSet(n)
+    assert c_dset.kruskal(walls, c_grid) == 1
+    grid = numpy.ones(width * height, dtype=numpy.uint8)
+    parent = numpy.arange(n, dtype=numpy.int32)
+    sz = numpy.ones(n, dtype=numpy.int32)
+    assert _kruskal_core(walls, parent, sz, grid, n) == 1
+    assert (c_grid == grid).all()
+    assert (grid == 0).sum() == n - 1
+
+
+def test_seed():
+    maze = KruskalMaze(21, 15, seed=7)
+    assert (maze.grid == KruskalMaze(21, 15, seed=7).grid).all()
+    assert (maze.grid != KruskalMaze(21, 15, seed=8).grid).any()
+
+
+class _SubMaze(KruskalMaze):
+    pass
+
+
+def test_generate_batch():
+    mazes = _SubMaze.generate_batch(4, 21, 15, workers=2, seed=3)
+    assert len(mazes) == 4
+    assert all(type(maze) is _SubMaze for maze in mazes)
+    # the batch must equal the mazes built one by one with seed + i
+    for i, maze in enumerate(mazes):
+        assert (maze.grid == KruskalMaze(21, 15, seed=3 + i).grid).all()
+
+
 def main():
     maze = KruskalMaze(9, 7)
     print(maze)
@@ -0,0 +1,17 @@
+from setuptools import setup, Extension
+
+try:
+    from Cython.Build import cythonize
+except ImportError:  # Cython is optional, MazeCellDSet falls back to the python implementation
+    ext_modules = []
+else:
+    ext_modules = cythonize(
+        [Extension("maze_algo._disjoint_set", ["maze_algo/_disjoint_set.pyx"], extra_compile_args=["-O3"])],
+    )
+
+setup(
+    name="maze_algo",
+    packages=["maze_algo"],
+    install_requires=["numpy"],
+    ext_modules=ext_modules,
+)